@@ -14,30 +14,64 @@
 # - Added graceful exit on keyboard interrupt
 # - Added settings for serial and server timeouts
 # - Added robust server and serial port restarts
+# - Replaced reader/writer/poller threads with a single asyncio event loop
+# - Serial port is watched by the event loop (Linux) instead of a blocking read
+# - Each client is handled in its own task, optionally on uvloop
+# - Serial port stays open between client connections
 # Date: October 1, 2024
 #
 # SPDX-License-Identifier:    BSD-3-Clause
 
+import asyncio
+import errno
+import ipaddress
 import logging
+import os
+import select
+import signal
 import socket
-import time
-import threading
+import sys
 import serial
 import serial.rfc2217
 
+# uvloop is optional, fall back to the standard asyncio event loop without it
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# pyudev is optional (Linux only), used to wake up as soon as a serial device appears
+try:
+    import pyudev
+except ImportError:
+    pyudev = None
+
+# termios is POSIX only, its errors also mean the serial device went away
+try:
+    import termios
+    SERIAL_ERRORS = (serial.SerialException, OSError, termios.error)
+except ImportError:
+    SERIAL_ERRORS = (serial.SerialException, OSError)
+
 __version__ = "0.1"
 
 # ------------------------------------------------------------------------------
 # Settings
 
 SERIAL_WAIT = 1.0           # Time (seconds) between checking for serial connection
+SERIAL_EVENT_TIMEOUT = 10.0 # Max time (seconds) to wait for a udev tty event before checking
 SERIAL_TIMEOUT = 1.0        # Time (seconds) to wait for serial data
-SERVER_WAIT = 1.0           # Time (seconds) between checking for server connection
-SERVER_TIMEOUT = 1.0        # Time (seconds) to wait for server data
-IP_WHITELIST = [            # List of IP addresses that are allowed to connect
+SERIAL_READ_SIZE = 4096     # Maximum number of bytes to read from serial at once
+SERIAL_INTER_BYTE_TIMEOUT = 0.005   # Idle gap (seconds) that ends a serial read (Windows)
+SOCKET_READ_SIZE = 65536    # Maximum number of bytes to read from the socket at once
+SOCKET_BUFFER_SIZE = 262144 # Kernel send/receive buffer size (bytes) for client sockets
+SOCKET_QUEUE_SIZE = 1048576 # Bytes queued for a slow client before serial reads pause
+SERVER_WAIT = 1.0           # Time (seconds) to wait before accepting again after a socket error
+IP_WHITELIST = [            # Hosts, IP addresses or networks (CIDR) allowed to connect
     "localhost",
     "0.0.0.0",
     "127.0.0.1",
+    "::1",
 ]  
 
 # ------------------------------------------------------------------------------
@@ -48,89 +82,279 @@ class Redirector():
     Handle redirecting data between a serial port and a socket.
     """
     
-    def __init__(self, serial_instance, socket, debug=False):
+    def __init__(self, serial_instance, sock_reader, sock_writer, debug=False):
         self.serial = serial_instance
-        self.socket = socket
-        self._write_lock = threading.Lock()
+        self.sock_reader = sock_reader
+        self.sock_writer = sock_writer
+        self.sock_writer.transport.set_write_buffer_limits(high=SOCKET_QUEUE_SIZE)
+        self.serial_ready = asyncio.Event()
+        self.poll_handle = None
+        self.corked = None
+        self.serial_failed = False
         self.rfc2217 = serial.rfc2217.PortManager(
             self.serial,
             self,
             logger=logging.getLogger("rfc2217.server") if debug else None)
         self.log = logging.getLogger("redirector")
 
-    def statusline_poller(self):
-        self.log.debug("Status line poll thread started")
-        while self.alive:
-            time.sleep(1)
-            try:
-                self.rfc2217.check_modem_lines()
-            except serial.SerialException as e:
-                self.log.error(f"Error polling modem lines: {e}")
-        self.log.debug("Status line poll thread terminated")
+    def poll_modem_lines(self):
+        """
+        Check the modem lines and notify the client of changes, then schedule the next check
+        """
+        try:
+            self.rfc2217.check_modem_lines()
+        except SERIAL_ERRORS as e:
+
+            # Ports without modem lines (e.g. ptys) will never have any, so stop asking
+            if getattr(e, "errno", None) in (errno.EINVAL, errno.ENOTTY):
+                self.log.warning("Modem lines not available, no longer polling them: %s", e)
+                return
+            self.log.error("Error polling modem lines: %s", e)
+        if self.alive:
+            self.poll_handle = asyncio.get_running_loop().call_later(1, self.poll_modem_lines)
 
-    def shortcircuit(self):
+    async def shortcircuit(self):
         """
         Connect the serial port to the TCP port by copying everything from one side to the other
         """
         self.alive = True
-        self.thread_read = threading.Thread(target=self.reader)
-        self.thread_read.daemon = True
-        self.thread_read.name = "serial->socket"
-        self.thread_read.start()
-        self.thread_poll = threading.Thread(target=self.statusline_poller)
-        self.thread_poll.daemon = True
-        self.thread_poll.name = "status line poll"
-        self.thread_poll.start()
-        self.writer()
-
-    def reader(self):
+        self.poll_handle = asyncio.get_running_loop().call_later(1, self.poll_modem_lines)
+        await asyncio.gather(
+            self.reader_coro(),
+            self.writer_coro(),
+        )
+
+    def serial_fd(self):
+        """
+        Return the serial port file descriptor if the event loop can watch it, None otherwise
+        """
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return self.serial.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    async def reader_coro(self):
         """
         Loop forever and copy serial->socket
         """
-        self.log.debug("Reader thread started")
-        while self.alive:
-            # Read from the serial port
+        loop = asyncio.get_running_loop()
+        self.log.debug("Reader task started")
+
+        # Let the event loop tell us when the serial port is readable, for the whole session
+        fd = self.serial_fd()
+        if fd is not None:
             try:
-                data = self.serial.read(self.serial.in_waiting or 1)
-                if data:
+                loop.add_reader(fd, self.serial_ready.set)
+            except (OSError, ValueError):
+                fd = None
+        self.log.debug("Serial port %s", "watched by event loop" if fd is not None else "read in executor")
+
+        # Look up everything the loop needs once, so each pass only touches locals
+        serial_ready = self.serial_ready
+        read_serial_fd = self.read_serial_fd
+        read_serial = self.read_serial
+        run_in_executor = loop.run_in_executor
+        add_reader = loop.add_reader
+        remove_reader = loop.remove_reader
+        write = self.write
+        write_escaped = self.write_escaped
+        drain = self.sock_writer.drain
+        write_buffer_size = self.sock_writer.transport.get_write_buffer_size
+        iac = serial.rfc2217.IAC
+
+        try:
+            while self.alive:
+                try:
+
+                    # Wait for the event loop to see serial data, then read what is waiting
+                    if fd is not None:
+                        await serial_ready.wait()
+                        serial_ready.clear()
+                        if not self.alive:
+                            break
+                        data = read_serial_fd(fd)
+
+                    # Otherwise, block on the serial port off the event loop
+                    else:
+                        data = await run_in_executor(None, read_serial)
+
+                # Serial errors mean the device went away, so the port has to be reopened
+                except SERIAL_ERRORS as msg:
+                    self.log.error("%s", msg)
+                    self.serial_failed = True
+                    break
+
+                if not data:
+                    continue
+
+                try:
+
                     # escape outgoing data when needed (Telnet IAC (0xff) character)
-                    self.write(b''.join(self.rfc2217.escape(data)))
+                    if iac in data:
+                        write_escaped(data)
+                    else:
+                        write(data)
+
+                    # Once SOCKET_QUEUE_SIZE bytes are waiting for a slow client, drain() blocks
+                    # and serial reads pause. Readiness is level-triggered, so the fd is unwatched
+                    # until then, otherwise the loop would wake on every pass.
+                    if write_buffer_size() > SOCKET_QUEUE_SIZE:
+                        self.log.debug("Client is falling behind, pausing serial reads")
+                        if fd is not None:
+                            remove_reader(fd)
+                        try:
+                            await drain()
+                        finally:
+                            if fd is not None:
+                                add_reader(fd, serial_ready.set)
+                    else:
+                        await drain()
 
-            # Catch exceptions, likely a result of the serial port being closed
-            except socket.error as msg:
-                self.log.error(f"{msg}")
-                break
-        self.alive = False
-        self.log.debug("Reader thread terminated")
+                # Socket errors only end this client's session
+                except socket.error as msg:
+                    self.log.error("%s", msg)
+                    break
+        finally:
+            if fd is not None:
+                remove_reader(fd)
+        self.log.debug("Reader task terminated")
+        self.stop()
+
+    def read_serial(self):
+        """
+        Block until serial data arrives (or times out), then grab the rest of the burst
+        """
+        # With an inter-byte timeout (Windows), one read returns the burst after an idle gap
+        if self.serial.inter_byte_timeout and isinstance(self.serial, serial.Serial):
+            return self.serial.read(SERIAL_READ_SIZE)
+
+        # Otherwise, block for the first byte and then take whatever else is waiting
+        data = self.serial.read(1)
+        if data:
+            waiting = min(self.serial.in_waiting, SERIAL_READ_SIZE - 1)
+            if waiting:
+                data += self.serial.read(waiting)
+        return data
+
+    def read_serial_fd(self, fd):
+        """
+        Read whatever is waiting straight from a readable serial file descriptor
+        """
+        try:
+            data = os.read(fd, SERIAL_READ_SIZE)
+        except BlockingIOError:
+            return b''
+
+        # The port is set up with VMIN=0, so a stale wakeup also reads nothing. Only if
+        # the port still claims to be readable has the device gone away.
+        if not data:
+            ready, _, _ = select.select([fd], [], [], 0)
+            if not ready:
+                return b''
+            data = os.read(fd, SERIAL_READ_SIZE)
+            if not data:
+                raise serial.SerialException(
+                    "device reports readiness to read but returned no data "
+                    "(device disconnected or multiple access on port?)")
+        return data
 
     def write(self, data):
         """
-        Thread safe socket write with no data escaping. used to send telnet stuff
+        Buffered socket write with no data escaping. used to send telnet stuff
         """
-        with self._write_lock:
-            self.socket.sendall(data)
+        if self.corked is not None:
+            self.corked.append(data)
+        else:
+            self.sock_writer.write(data)
 
-    def writer(self):
+    def write_escaped(self, data):
+        """
+        Socket write that doubles every IAC (one C-level pass over the data)
+        """
+        self.sock_writer.write(
+            data.replace(serial.rfc2217.IAC, serial.rfc2217.IAC + serial.rfc2217.IAC)
+        )
+
+    def filter_data(self, data):
+        """
+        Strip Telnet/RFC 2217 commands from client data. Runs of plain data are copied
+        as whole slices, only command bytes go through the PortManager filter.
+        """
+        # Collect telnet replies and send them together once the chunk is processed
+        self.corked = []
+        try:
+            out = bytearray()
+            pos = 0
+            end = len(data)
+            while pos < end:
+
+                # Copy everything up to the next IAC in one go
+                if self.rfc2217.mode == serial.rfc2217.M_NORMAL and self.rfc2217.suboption is None:
+                    iac = data.find(serial.rfc2217.IAC, pos)
+                    if iac < 0:
+                        out += data[pos:]
+                        break
+                    out += data[pos:iac]
+                    pos = iac
+
+                # Inside a command, let the PortManager interpret it byte by byte
+                for piece in self.rfc2217.filter(data[pos:pos + 1]):
+                    out += piece
+                pos += 1
+        finally:
+            corked, self.corked = self.corked, None
+            if corked:
+                self.sock_writer.writelines(corked)
+        return bytes(out)
+
+    async def writer_coro(self):
         """
         Loop forever and copy socket->serial
         """
+        loop = asyncio.get_running_loop()
+
+        # Look up everything the loop needs once, so each pass only touches locals
+        sock_read = self.sock_reader.read
+        rfc2217 = self.rfc2217
+        filter_data = self.filter_data
+        serial_write = self.serial.write
+        run_in_executor = loop.run_in_executor
+        iac = serial.rfc2217.IAC
+        m_normal = serial.rfc2217.M_NORMAL
+
         while self.alive:
-            # Read from the socket
+            # Read from the socket, socket errors only end this client's session
             try:
-                data = self.socket.recv(1024)
-                if not data:
-                    break
-                self.serial.write(b''.join(self.rfc2217.filter(data)))
+                data = await sock_read(SOCKET_READ_SIZE)
+            except socket.error as msg:
+                self.log.error("%s", msg)
+                break
+            if not data:
+                break
 
-            # Catch non-blocking socket exception, just keep going
-            except BlockingIOError:
-                pass
+            try:
 
-            # Catch exceptions, likely a result of the serial port being closed
-            except socket.error as msg:
-                self.log.error(f"{msg}")
+                # Plain data outside of any Telnet command can skip the filter (which may
+                # also touch the serial port, e.g. to change the baud rate or purge buffers)
+                if rfc2217.mode == m_normal and rfc2217.suboption is None and iac not in data:
+                    filtered = data
+                else:
+                    filtered = filter_data(data)
+                await run_in_executor(None, serial_write, filtered)
+
+            # A write timeout only means flow control held the data back, the port is fine
+            except serial.SerialTimeoutException as msg:
+                self.log.error("%s", msg)
                 break
-        self.log.debug("Writer thread terminated")
+
+            # Other serial errors mean the device went away, so the port has to be reopened
+            except SERIAL_ERRORS as msg:
+                self.log.error("%s", msg)
+                self.serial_failed = True
+                break
+        self.log.debug("Writer task terminated")
         self.stop()
 
     def stop(self):
@@ -138,27 +362,309 @@ class Redirector():
         Stop copying
         """
         self.log.debug("Stopping")
-        if self.alive:
-            self.alive = False
-            self.thread_read.join()
-            self.thread_poll.join()
+        self.alive = False
+        self.serial_ready.set()
+        if self.poll_handle is not None:
+            self.poll_handle.cancel()
+
+        # Closing the stream ends the writer's pending socket read
+        self.sock_writer.close()
 
 # ------------------------------------------------------------------------------
 # Functions
 
-def is_socket_connected(sock):
+def resolve_whitelist(entries):
     """
-    Check if a client socket is still connected. Only works with nonblocking sockets.
+    Resolve whitelist entries once into a set of addresses and a list of networks.
     """
-    if sock is None:
-        return False
-    try:
-        data = sock.recv(1)
-        if data == b"":
-            return False
-        return True
-    except socket.error:
+    addresses = set()
+    networks = []
+    for entry in entries:
+
+        # IP addresses and networks are used as-is
+        try:
+            network = ipaddress.ip_network(entry, strict=False)
+        except ValueError:
+            network = None
+        if network is not None:
+            if network.num_addresses == 1:
+                addresses.add(str(network.network_address))
+            else:
+                networks.append(network)
+            continue
+
+        # Anything else is a host name (resolved to both IPv4 and IPv6 addresses)
+        try:
+            for info in socket.getaddrinfo(entry, None, proto=socket.IPPROTO_TCP):
+                addresses.add(info[4][0])
+        except socket.error as e:
+            logging.warning("Could not resolve whitelist entry %s: %s", entry, e)
+
+    return frozenset(addresses), networks
+
+def client_address(host):
+    """
+    Return the client's IP address, unwrapping IPv4 clients seen on a dual-stack socket.
+    """
+    if host.startswith("::ffff:"):
+        mapped = ipaddress.ip_address(host).ipv4_mapped
+        if mapped is not None:
+            return str(mapped)
+    return host
+
+def is_whitelisted(host, addresses, networks):
+    """
+    Check if a client address is in the resolved whitelist.
+    """
+    if host in addresses:
         return True
+    if networks:
+        ip = ipaddress.ip_address(host)
+        return any(ip in network for network in networks)
+    return False
+
+def create_server_socket(port):
+    """
+    Create the listening socket, accepting IPv4 and IPv6 clients where supported.
+    """
+    if socket.has_dualstack_ipv6():
+        srv = socket.create_server(
+            ("", port),
+            family=socket.AF_INET6,
+            backlog=1,
+            dualstack_ipv6=True)
+    else:
+        srv = socket.create_server(("", port), backlog=1)
+    srv.setblocking(False)
+    return srv
+
+def open_udev_monitor(port):
+    """
+    Start listening for tty device events from udev. Returns None if udev is not available
+    or the port is not a local device (e.g. a rfc2217:// or socket:// URL).
+    """
+    if pyudev is None or not sys.platform.startswith("linux"):
+        return None
+    if not port or not port.startswith("/dev/"):
+        return None
+    try:
+        monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+        monitor.filter_by("tty")
+        monitor.start()
+    except (ImportError, OSError) as e:
+        logging.debug("udev monitor not available: %s", e)
+        return None
+    return monitor
+
+async def wait_for_serial_device(monitor):
+    """
+    Wait for a tty device event from udev, or for SERIAL_WAIT seconds without udev.
+    """
+    if monitor is None:
+        await asyncio.sleep(SERIAL_WAIT)
+        return
+
+    # Let the event loop watch the udev socket
+    loop = asyncio.get_running_loop()
+    event = asyncio.Event()
+    loop.add_reader(monitor.fileno(), event.set)
+    try:
+        await asyncio.wait_for(event.wait(), SERIAL_EVENT_TIMEOUT)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        loop.remove_reader(monitor.fileno())
+
+    # Any tty event is a reason to try again, so drop the rest of the queue
+    while monitor.poll(timeout=0) is not None:
+        pass
+
+def set_control_lines(ser, state):
+    """
+    Set DTR and RTS, ignoring ports without modem control lines (e.g. ptys) like pyserial does.
+    """
+    try:
+        ser.dtr = state
+        ser.rts = state
+    except OSError as e:
+        if e.errno not in (errno.EINVAL, errno.ENOTTY):
+            raise
+
+async def handle_client(ser, client, lock, debug=False):
+    """
+    Redirect one accepted client to the serial port once no other client is using it.
+    """
+    try:
+
+        # Set TCP_NODELAY to disable Nagle's algorithm
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # Ask for immediate ACKs on small control packets (Linux only)
+        if hasattr(socket, "TCP_QUICKACK"):
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+        # Enlarge kernel buffers so bursts need fewer syscalls
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+
+        # Only one client can use the serial port at a time
+        if lock.locked():
+            logging.info("Serial port is busy, waiting for the current client to disconnect")
+        async with lock:
+
+            # Wait for serial connection and prepare it for this client
+            while True:
+
+                # Wait for serial connection (watching udev for the device to show up)
+                monitor = None if ser.is_open else open_udev_monitor(ser.port)
+                while not ser.is_open:
+                    try:
+                        ser.open()
+                    except serial.SerialException as e:
+                        
+                        # If serial port is already open, close it and try again
+                        if "Port is already open" in str(e):
+                            ser.close()
+
+                        # Let the user know if the port is already in use
+                        elif "PermissionError" in str(e):
+                            logging.error("Port %s is already in use", ser.name)
+
+                        # Linux reports EACCES as "Permission denied", udev will not wake us for it
+                        elif "Permission denied" in str(e):
+                            logging.error("Permission denied for port %s", ser.name)
+
+                        # Otherwise, wait for the device to appear and try again
+                        else:
+                            logging.info("Waiting for serial connection on %s...", ser.name)
+                            await wait_for_serial_device(monitor)
+                            continue
+
+                        # Wait and try again
+                        await asyncio.sleep(SERIAL_WAIT)
+                        continue
+
+                try:
+
+                    # The port stays open between clients, so drop anything left over from before
+                    ser.reset_input_buffer()
+
+                    # Save serial port settings
+                    settings = ser.get_settings()
+
+                    # Set DTR and RTS to True to simulate a terminal being connected
+                    set_control_lines(ser, True)
+                    break
+
+                # The device went away while no client was connected, so wait and reopen it
+                except SERIAL_ERRORS as e:
+                    logging.warning("Serial port %s failed: %s", ser.name, e)
+                    ser.close()
+                    await asyncio.sleep(SERIAL_WAIT)
+
+            # Print connection information
+            logging.info("Connected to %s", ser.name)
+
+            # Wrap the client socket in asyncio streams
+            sock_reader, sock_writer = await asyncio.open_connection(sock=client)
+
+            # Create a redirector object
+            r = Redirector(
+                ser,
+                sock_reader,
+                sock_writer,
+                debug
+            )
+
+            # Start the redirector
+            try:
+                await r.shortcircuit()
+
+            # Any exceptions, stop the redirector
+            finally:
+
+                # Stop the redirector and the client socket
+                logging.info("Disconnected")
+                r.stop()
+
+                # Reset serial port settings, but keep the port open for the next client
+                try:
+                    set_control_lines(ser, False)
+                    ser.apply_settings(settings)
+                except SERIAL_ERRORS as e:
+                    logging.warning("Could not reset serial port %s: %s", ser.name, e)
+                    r.serial_failed = True
+
+                # If the device went away, close it so the next client reopens it
+                if r.serial_failed:
+                    logging.info("Closing %s", ser.name)
+                    ser.close()
+
+    # Catch socket errors
+    except socket.error as e:
+        logging.error("Socket error: %s", e)
+
+    # Make sure the client is closed if we never got to the redirector
+    finally:
+        client.close()
+
+async def accept_clients(ser, srv, clients, debug=False):
+    """
+    Accept client connections and hand each one to its own task.
+    """
+    loop = asyncio.get_running_loop()
+    lock = asyncio.Lock()
+    addresses, networks = resolve_whitelist(IP_WHITELIST)
+
+    while True:
+        try:
+
+            # Wait for a client connection (shutdown cancels this task)
+            client, addr = await loop.sock_accept(srv)
+            host = client_address(addr[0])
+            logging.info("Connection request from %s:%s", host, addr[1])
+
+            # Check if client IP is in whitelist
+            if not is_whitelisted(host, addresses, networks):
+                logging.warning("Connection request from %s denied", host)
+                client.close()
+                continue
+
+            # Serve the client without blocking the accept loop
+            task = asyncio.create_task(handle_client(ser, client, lock, debug))
+            clients.add(task)
+            task.add_done_callback(clients.discard)
+
+        # Catch socket errors (e.g. out of file descriptors), then try again
+        except socket.error as e:
+            logging.error("Socket error: %s", e)
+            await asyncio.sleep(SERVER_WAIT)
+
+async def serve(ser, srv, debug=False):
+    """
+    Run the server until SIGINT or SIGTERM, then shut down all client sessions.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    clients = set()
+
+    # Stop on signals where the event loop supports it (not on Windows, where Ctrl-C
+    # still arrives as KeyboardInterrupt)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    # Accept clients until asked to stop
+    acceptor = asyncio.create_task(accept_clients(ser, srv, clients, debug))
+    await stop.wait()
+
+    # Cancel the acceptor and any client sessions, letting them clean up
+    acceptor.cancel()
+    for task in clients:
+        task.cancel()
+    await asyncio.gather(acceptor, *clients, return_exceptions=True)
 
 # ------------------------------------------------------------------------------
 # Main
@@ -174,8 +680,8 @@ if __name__ == "__main__":
 NOTE: no security measures are implemented. Anyone can remotely connect
 to this service over the network.
 
-Only one connection at once is supported. When the connection is terminated
-it waits for the next connect.
+Only one connection at once is supported. Further clients wait until the
+current connection is terminated.
 """)
 
     # Configure command line arguments
@@ -186,6 +692,12 @@ it waits for the next connect.
         help="local TCP port, default: %(default)s",
         metavar="TCPPORT",
         default=2217)
+    parser.add_argument(
+        "-c", "--cpu",
+        type=int,
+        help="pin the server to this CPU core (Linux only), default: no pinning",
+        metavar="CPU",
+        default=None)
     parser.add_argument(
         "-v", "--verbose",
         dest="verbosity",
@@ -208,115 +720,53 @@ it waits for the next connect.
     logging.getLogger("rfc2217").setLevel(levels[args.verbosity])
     logging.getLogger("redirector").setLevel(levels[args.verbosity])
 
+    # Pin the event loop (and any executor threads it starts) to one CPU
+    if args.cpu is not None:
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, {args.cpu})
+            except (OSError, ValueError) as e:
+                parser.error(f"cannot pin to CPU {args.cpu}: {e}")
+            logging.info("Pinned to CPU %s", args.cpu)
+        else:
+            logging.warning("CPU pinning is not supported on this platform")
+
     # Create the serial port
     ser = serial.serial_for_url(args.SERIALPORT, do_not_open=True)
     ser.timeout = SERIAL_TIMEOUT
     ser.write_timeout = SERIAL_TIMEOUT
+    if sys.platform == "win32":
+        ser.inter_byte_timeout = SERIAL_INTER_BYTE_TIMEOUT
     ser.dtr = False
     ser.rts = False
 
+    # Open the serial port once, it stays open across client connections
+    try:
+        ser.open()
+    except serial.SerialException as e:
+        logging.info("Serial port %s not available yet: %s", ser.name, e)
+
     # Create the server socket
-    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    srv.bind(("", args.localport))
-    srv.listen(1)
-    srv.settimeout(SERVER_TIMEOUT)
-    logging.info(f"The server is listening on port {args.localport}")
+    srv = create_server_socket(args.localport)
+    logging.info("The server is listening on port %s", args.localport)
 
     # Welcome message
     logging.info("RFC 2217 TCP/IP to Serial redirector - type Ctrl-C / BREAK to quit")
 
-    # Main loop
-    while True:
-        try:
-
-            # Wait for a client connection
-            client = None
-            while not is_socket_connected(client):
-                try:
-                    client, addr = srv.accept()
-                    logging.info(f"Connection request from {addr[0]}:{addr[1]}")
-
-                # Catch timeout exception, just keep going
-                except socket.timeout:
-                    logging.info("Waiting for client connection...")
-                    time.sleep(SERVER_WAIT)
-                    continue
-
-            # Check if client IP is in whitelist
-            if addr[0] not in IP_WHITELIST:
-                logging.warning(f"Connection request from {addr[0]} denied")
-                client.close()
-                continue
-
-            # Set TCP_NODELAY to disable Nagle's algorithm
-            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-
-            # Set non-blocking mode
-            client.setblocking(False)
-
-            # Wait for serial connection
-            while not ser.is_open:
-                try:
-                    ser.open()
-                except serial.SerialException as e:
-                    
-                    # If serial port is already open, close it and try again
-                    if "Port is already open" in str(e):
-                        ser.close()
-
-                    # Let the user know if the port is already in use
-                    elif "PermissionError" in str(e):
-                        logging.error(f"Port {ser.name} is already in use")
-
-                    # Otherwise, wait and try again
-                    else:
-                        logging.info(f"Waiting for serial connection on {ser.name}...")
-
-                    # Wait and try again
-                    time.sleep(SERIAL_WAIT)
-                    continue
-
-            # Print connection information
-            logging.info(f"Connected to {ser.name}")
-
-            # Save serial port settings
-            settings = ser.get_settings()
-
-            # Set DTR and RTS to True to simulate a terminal being connected
-            ser.dtr = True
-            ser.rts = True
-
-            # Create a redirector object
-            r = Redirector(
-                ser,
-                client,
-                args.verbosity > 0
-            )
-
-            # Start the redirector
-            try:
-                r.shortcircuit()
+    # Main loop (on uvloop if it is installed)
+    run = asyncio.run
+    if uvloop is not None:
 
-            # Any exceptions, stop the redirector
-            finally:
-
-                # Stop the redirector and the client socket
-                logging.info("Disconnected")
-                r.stop()
-                client.close()
-
-                # Reset serial port settings
-                ser.dtr = False
-                ser.rts = False
-                ser.apply_settings(settings)
-                ser.close()
-
-        # Catch keyboard interrupt
-        except KeyboardInterrupt:
-            logging.info("Exiting...")
-            break
+        # uvloop.run() only exists in uvloop 0.18 and newer
+        if hasattr(uvloop, "run"):
+            run = uvloop.run
+        else:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        run(serve(ser, srv, args.verbosity > 0))
 
-        # Catch socket errors
-        except socket.error as e:
-            logging.error(f"Socket error: {e}")
+    # Catch keyboard interrupt
+    except KeyboardInterrupt:
+        pass
+    logging.info("Exiting...")
+    ser.close()